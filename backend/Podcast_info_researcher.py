@@ -1,10 +1,22 @@
 import os
+import re
 import json
-import base64
+import hashlib
+import random
 import asyncio
-from typing import TypedDict, Optional, List
+import threading
+import orjson
+from collections import OrderedDict
+from typing import TypedDict, Optional, List, AsyncIterator, Union
 from datetime import datetime, timedelta
-from openai import AsyncOpenAI
+import httpx
+from openai import (
+    AsyncOpenAI,
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+    RateLimitError,
+)
 
 # ----- Type Definitions -----
 class ResearchRequest(TypedDict):
@@ -61,37 +73,50 @@ class ResearchOutput(TypedDict):
     suggestedTone: str
     scriptNotesForSpeaker: List[str]
 
+class PodcastResult(TypedDict):
+    research: ResearchOutput
+    script: List[PodcastScript]
+
 # ----- Cache Management -----
 class CacheEntry:
-    def __init__(self, value: ResearchOutput):
+    def __init__(self, value: PodcastResult):
         self.value = value
         self.ts = datetime.now()
 
-cache: dict[str, CacheEntry] = {}
+_cache: OrderedDict[str, CacheEntry] = OrderedDict()
+_cache_lock = threading.Lock()
 CACHE_TTL_SECONDS = 3600  # 1 hour
+MAX_CACHE = 512  # entries, least recently used are evicted first
 
 def cache_key(req: ResearchRequest) -> str:
     """Generate cache key from request"""
-    json_str = json.dumps(req, sort_keys=True)
-    return base64.b64encode(json_str.encode()).decode()
+    return hashlib.blake2b(orjson.dumps(req, option=orjson.OPT_SORT_KEYS), digest_size=16).hexdigest()
 
-def get_from_cache(key: str) -> Optional[ResearchOutput]:
+def get_from_cache(key: str) -> Optional[PodcastResult]:
     """Retrieve from cache if not expired"""
-    if key not in cache:
-        return None
-    
-    entry = cache[key]
-    if (datetime.now() - entry.ts).total_seconds() > CACHE_TTL_SECONDS:
-        del cache[key]
-        return None
-    
-    return entry.value
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None:
+            return None
+
+        if (datetime.now() - entry.ts).total_seconds() > CACHE_TTL_SECONDS:
+            del _cache[key]
+            return None
 
-def set_cache(key: str, value: ResearchOutput) -> None:
-    """Store in cache"""
-    cache[key] = CacheEntry(value)
+        _cache.move_to_end(key)
+        return entry.value
+
+def set_cache(key: str, value: PodcastResult) -> None:
+    """Store in cache, evicting the least recently used entries past MAX_CACHE"""
+    with _cache_lock:
+        _cache[key] = CacheEntry(value)
+        _cache.move_to_end(key)
+        while len(_cache) > MAX_CACHE:
+            _cache.popitem(last=False)
 
 # ----- Style Guides -----
+DEFAULT_STYLE = 'conversational'
+
 STYLE_GUIDES = {
     'conversational': 'Friendly, casual, like two friends chatting. Use colloquialisms, ask rhetorical questions, keep it light but informative.',
     'documentary': 'Formal, authoritative, journalistic. Focus on facts, timeline, verified sources. Narration-heavy, educational.',
@@ -101,61 +126,62 @@ STYLE_GUIDES = {
 }
 
 # ----- Prompt Builder -----
-def build_prompt(req: ResearchRequest) -> str:
-    """Build Claude prompt"""
-    style = req.get('style', 'conversational')
-    language = req.get('language', 'English')
-    style_guide = STYLE_GUIDES.get(style, STYLE_GUIDES['conversational'])
-
-    return f"""You are an expert podcast research assistant. Your job is to generate a structured research brief for a {req['durationMinutes']}-minute podcast episode.
+_PROMPT_TEMPLATE = """You are an expert podcast research assistant and script writer. Your job is to generate a structured research brief for a {duration}-minute podcast episode, then write the full two-person dialogue script for that episode based on your research.
 
 CRITICAL: Output ONLY valid JSON. No markdown, no explanation, no backticks. Start with {{ and end with }}.
 
 STYLE & TONE:
 {style_guide}
 
-TARGET DURATION: {req['durationMinutes']} minutes ({req['durationMinutes'] * 60} total seconds)
+TARGET DURATION: {duration} minutes ({duration_seconds} total seconds)
 
 SCHEMA (output exactly these fields):
 {{
-  "topic": string,
-  "language": string,
-  "estimatedDurationMinutes": number,
-  "shortSummary": string (1-2 sentences, compelling hook),
-  "episodeOutline": {{
-    "segments": [
+  "research": {{
+    "topic": string,
+    "language": string,
+    "estimatedDurationMinutes": number,
+    "shortSummary": string (1-2 sentences, compelling hook),
+    "episodeOutline": {{
+      "segments": [
+        {{
+          "id": string (s1, s2, etc),
+          "title": string (segment name matching the style),
+          "purpose": string (why this segment exists),
+          "approxDurationSeconds": number,
+          "bullets": string[] (3-8 talking points the host can speak)
+        }}
+      ]
+    }},
+    "keyFacts": [
       {{
-        "id": string (s1, s2, etc),
-        "title": string (segment name matching the style),
-        "purpose": string (why this segment exists),
-        "approxDurationSeconds": number,
-        "bullets": string[] (3-8 talking points the host can speak)
+        "fact": string (single fact or statistic),
+        "source": string or null (URL if available),
+        "confidence": number (0-1, 1.0 = verified)
       }}
-    ]
+    ],
+    "importantTerms": [
+      {{ "term": string, "definition": string }}
+    ],
+    "notablePeopleOrEntities": [
+      {{ "name": string, "whyRelevant": string, "shortQuote": string (optional) }}
+    ],
+    "recommendedSources": [
+      {{ "title": string, "url": string (optional), "type": string (optional) }}
+    ],
+    "suggestedHooks": string[] (4-6 opening lines, each ≤20 words),
+    "suggestedTone": string (one phrase describing how the host should sound),
+    "scriptNotesForSpeaker": string[] (6-10 actionable notes for pacing, emotion, SFX)
   }},
-  "keyFacts": [
-    {{
-      "fact": string (single fact or statistic),
-      "source": string or null (URL if available),
-      "confidence": number (0-1, 1.0 = verified)
-    }}
-  ],
-  "importantTerms": [
-    {{ "term": string, "definition": string }}
-  ],
-  "notablePeopleOrEntities": [
-    {{ "name": string, "whyRelevant": string, "shortQuote": string (optional) }}
-  ],
-  "recommendedSources": [
-    {{ "title": string, "url": string (optional), "type": string (optional) }}
-  ],
-  "suggestedHooks": string[] (4-6 opening lines, each ≤20 words),
-  "suggestedTone": string (one phrase describing how the host should sound),
-  "scriptNotesForSpeaker": string[] (6-10 actionable notes for pacing, emotion, SFX)
+  "script": [
+    {{"speaker": "Host", "text": "...", "audioEffect": "fade_in"}},
+    {{"speaker": "Guest", "text": "...", "audioEffect": null}},
+    ...
+  ]
 }}
 
-REQUIREMENTS:
-1. Create 3-6 segments. Total duration should sum to ~{req['durationMinutes'] * 60} seconds.
+RESEARCH REQUIREMENTS:
+1. Create 3-6 segments. Total duration should sum to ~{duration_seconds} seconds.
 2. Segments MUST follow the {style} style guide above. Titles and bullets should reflect that style.
 3. Provide 6-12 key facts with credible sources when possible. If uncertain, set source=null and confidence low.
 4. Provide 4-6 hooks that grab attention and tease the episode's core value.
@@ -164,43 +190,223 @@ REQUIREMENTS:
 7. Important terms should define jargon the listener might not know.
 8. Notable people/entities should have a short reason why they matter (not just a quote).
 
-RESEARCH TOPIC: {req['topic']}
+SCRIPT CHARACTERS:
+- Host: The main presenter who guides the conversation, asks probing questions, and keeps things on track. Knowledgeable but curious.
+- Guest: An expert or enthusiastic co-host who brings additional insights, personal anecdotes, different perspectives, and sometimes challenges or builds on what the Host says. NOT a passive listener.
+
+CONVERSATION RULES:
+1. BOTH speakers should contribute substantive content and knowledge
+2. The Guest should share facts, opinions, and ask their own questions - NOT just react with "wow" or "interesting"
+3. Include natural interruptions, agreements, disagreements, and building on each other's points
+4. Use casual language, filler words occasionally (like "you know", "I mean", "right?")
+5. Have moments where they laugh, express surprise genuinely, or get excited
+6. The Guest can correct the Host or add nuance
+7. Include rhetorical questions and direct address to listeners occasionally
+8. Vary the length of responses - some short reactions, some longer explanations
+9. The script MUST cover the segments, key facts and terms from your research above
+
+Generate approximately {exchanges} dialogue exchanges for a {duration}-minute episode.
+Each line should be 1-4 sentences. Make it feel like a REAL conversation between two knowledgeable friends.
+
+RESEARCH TOPIC: {topic}
 OUTPUT LANGUAGE: {language}
 
 NOW OUTPUT THE JSON:"""
 
-# ----- OpenAI API Call -----
-async def call_openai(prompt: str) -> str:
-    """Call OpenAI API"""
-    api_key = os.getenv('OPENAI_API_KEY')
-    if not api_key:
-        raise ValueError('Missing OPENAI_API_KEY environment variable')
+_STYLE_PLACEHOLDER_RE = re.compile(r'\{(style_guide|style)\}')
 
-    client = AsyncOpenAI(api_key=api_key)
+def _fill_style(style: str, guide: str) -> str:
+    """Fill the style placeholders in one pass, escaping braces for the later format_map"""
+    values = {
+        'style': style.replace('{', '{{').replace('}', '}}'),
+        'style_guide': guide.replace('{', '{{').replace('}', '}}')
+    }
+    return _STYLE_PLACEHOLDER_RE.sub(lambda match: values[match.group(1)], _PROMPT_TEMPLATE)
+
+# Template with the style-dependent parts already filled in, per style
+_STYLE_PROMPTS = {style: _fill_style(style, guide) for style, guide in STYLE_GUIDES.items()}
+
+# Output token budget: ~2000 tokens for the research brief plus ~80 per dialogue
+# line (1-4 sentences and its JSON wrapping), within gpt-4o-mini's 16,384 output cap
+RESEARCH_MAX_TOKENS = 2000
+TOKENS_PER_EXCHANGE = 80
+MAX_OUTPUT_TOKENS = 16000
+MAX_EXCHANGES = (MAX_OUTPUT_TOKENS - RESEARCH_MAX_TOKENS) // TOKENS_PER_EXCHANGE
+
+def exchange_count(duration_minutes: int) -> int:
+    """Number of dialogue lines to ask for, capped so the reply fits the output budget"""
+    return min(MAX_EXCHANGES, max(15, duration_minutes * 3))
+
+def resolve_style(style: Optional[str]) -> str:
+    """Return the style if it has a style guide, otherwise the default style"""
+    return style if style in STYLE_GUIDES else DEFAULT_STYLE
+
+def build_combined_prompt(req: ResearchRequest, style: str) -> str:
+    """Build a single prompt that returns both the research brief and the dialogue script"""
+    duration = req['durationMinutes']
+
+    return _STYLE_PROMPTS[style].format_map({
+        'duration': duration,
+        'duration_seconds': duration * 60,
+        'exchanges': exchange_count(duration),
+        'topic': req['topic'],
+        'language': req.get('language', 'English')
+    })
 
-    response = await client.chat.completions.create(
+# ----- OpenAI API Call -----
+_client: Optional[AsyncOpenAI] = None
+
+def _get_client() -> AsyncOpenAI:
+    """Return the shared OpenAI client, creating it on first use"""
+    global _client
+    if _client is None:
+        api_key = os.getenv('OPENAI_API_KEY')
+        if not api_key:
+            raise ValueError('Missing OPENAI_API_KEY environment variable')
+
+        # Reuse one connection pool (and TLS sessions) across all calls
+        _client = AsyncOpenAI(
+            api_key=api_key,
+            # Retries are handled by _generate_uncached with jittered backoff
+            max_retries=0,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+                http2=True
+            )
+        )
+    return _client
+
+# JSON mode guarantees a syntactically valid JSON object (the prompt must mention JSON)
+JSON_RESPONSE_FORMAT = {'type': 'json_object'}
+
+# Transient failures worth retrying; other API errors (e.g. 400/401) are raised immediately
+RETRYABLE_ERRORS = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+MAX_ATTEMPTS = 3
+
+async def stream_openai(
+    prompt: str,
+    response_format: Optional[dict] = JSON_RESPONSE_FORMAT,
+    max_tokens: int = 2000
+) -> AsyncIterator[str]:
+    """Stream completion text from the OpenAI API as it arrives"""
+    client = _get_client()
+
+    options = {}
+    if response_format:
+        options['response_format'] = response_format
+
+    stream = await client.chat.completions.create(
         model='gpt-4o-mini',
         messages=[{'role': 'user', 'content': prompt}],
-        max_tokens=2000
+        max_tokens=max_tokens,
+        stream=True,
+        **options
     )
 
-    if not response.choices or not response.choices[0].message:
-        raise Exception('Unexpected OpenAI response format')
-
-    return response.choices[0].message.content
+    try:
+        async for part in stream:
+            if part.choices and part.choices[0].delta.content:
+                yield part.choices[0].delta.content
+    finally:
+        # Release the connection if the caller stops reading early
+        await stream.response.aclose()
+
+async def call_openai(
+    prompt: str,
+    response_format: Optional[dict] = JSON_RESPONSE_FORMAT,
+    max_tokens: int = 2000
+) -> Optional[Union[dict, list]]:
+    """Call OpenAI API and parse the JSON it returns"""
+    stream = stream_openai(prompt, response_format, max_tokens)
+    try:
+        return await parse_json_stream(stream)
+    finally:
+        await stream.aclose()
 
 # ----- JSON Extraction & Repair -----
-def extract_json(text: str) -> Optional[str]:
-    """Extract JSON from text"""
-    start = text.find('{')
-    if start == -1:
-        return None
-
-    end = text.rfind('}')
-    if end == -1 or end <= start:
-        return None
+_SINGLE_QUOTE_RE = re.compile(r"'([^']*?)'")
+_TRAILING_COMMA_RE = re.compile(r',\s*([}\]])')
+_STRUCTURAL_RE = re.compile(r'[{}\[\]"\\]')
+
+class TruncatedResponseError(Exception):
+    """Raised when the LLM reply stopped before its JSON document closed"""
+    def __init__(self, partial: Optional[Union[dict, list]], open_brackets: tuple):
+        super().__init__('LLM response was cut off before the JSON document closed')
+        # Whatever could be recovered from the complete values that did arrive,
+        # and the brackets that were still open where it was cut
+        self.partial = partial
+        self.open_brackets = open_brackets
+
+class _JsonDepthScanner:
+    """Track bracket nesting over streamed text to spot when a JSON document closes"""
+    def __init__(self):
+        self.stack: List[str] = []
+        self.in_string = False
+        self.escaped = False
+        # Length of text fed so far, where the current document starts and ends,
+        # and where its last nested value closed
+        self.consumed = 0
+        self.doc_start: Optional[int] = None
+        self.doc_end: Optional[int] = None
+        self.last_close = 0
+        self.open_at_last_close: tuple = ()
+
+    def feed(self, chunk: str) -> bool:
+        """Scan a chunk; return True if a top-level JSON value closed within it"""
+        closed = False
+        # Index up to which matches are skipped (the character after a backslash)
+        skip_to = 1 if self.escaped else 0
+        self.escaped = False
+
+        # Only visit structural characters, the rest of the text is skipped in C
+        for match in _STRUCTURAL_RE.finditer(chunk):
+            pos = match.start()
+            if pos < skip_to:
+                continue
+
+            ch = match.group()
+            if self.in_string:
+                if ch == '\\':
+                    if pos + 1 == len(chunk):
+                        self.escaped = True
+                    skip_to = pos + 2
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                # Quotes outside the document (e.g. leading prose) are ignored
+                if self.stack:
+                    self.in_string = True
+            elif ch in '{[':
+                if not self.stack:
+                    self.doc_start = self.consumed + pos
+                    self.doc_end = None
+                    self.last_close = 0
+                self.stack.append(ch)
+            elif self.stack:
+                self.stack.pop()
+                if not self.stack:
+                    self.doc_end = self.consumed + pos + 1
+                    closed = True
+                else:
+                    self.last_close = self.consumed + pos + 1
+                    self.open_at_last_close = tuple(self.stack)
+
+        self.consumed += len(chunk)
+        return closed
+
+    def document(self, text: str) -> str:
+        """Slice the current JSON document (object or array) out of the text fed so far"""
+        if self.doc_start is None:
+            return text
+        return text[self.doc_start:self.doc_end]
+
+    def recover(self, text: str) -> Optional[str]:
+        """Cut unfinished text back to its last complete nested value and close the open brackets"""
+        if not self.last_close:
+            return None
 
-    return text[start:end + 1]
+        closers = ''.join('}' if ch == '{' else ']' for ch in reversed(self.open_at_last_close))
+        return text[self.doc_start:self.last_close] + closers
 
 def repair_json(json_text: str) -> str:
     """Repair common JSON issues"""
@@ -210,24 +416,58 @@ def repair_json(json_text: str) -> str:
     repaired = repaired.replace('```json', '').replace('```', '')
 
     # Replace single quotes with double quotes
-    import re
-    repaired = re.sub(r"'([^']*?)'", r'"\1"', repaired)
+    repaired = _SINGLE_QUOTE_RE.sub(r'"\1"', repaired)
 
     # Remove trailing commas
-    repaired = re.sub(r',\s*([}\]])', r'\1', repaired)
+    repaired = _TRAILING_COMMA_RE.sub(r'\1', repaired)
 
     return repaired
 
 def safe_parse(json_text: str) -> Optional[dict]:
     """Safely parse JSON with repairs"""
+    # Text that doesn't start like JSON (e.g. a ```json fence) can't parse as-is,
+    # so skip the doomed attempt and its exception and go straight to repair
+    if json_text.lstrip()[:1] in ('{', '['):
+        try:
+            return orjson.loads(json_text)
+        except orjson.JSONDecodeError:
+            pass
+
     try:
-        return json.loads(json_text)
+        repaired = repair_json(json_text)
+        return json.loads(repaired)
     except json.JSONDecodeError:
-        try:
-            repaired = repair_json(json_text)
-            return json.loads(repaired)
-        except json.JSONDecodeError:
-            return None
+        return None
+
+async def parse_json_stream(stream: AsyncIterator[str]) -> Optional[Union[dict, list]]:
+    """Collect streamed text, parsing as soon as it forms a complete JSON document"""
+    # Collect chunks in a list and join only when needed; += on a str is quadratic
+    chunks: List[str] = []
+    scanner = _JsonDepthScanner()
+
+    async for content in stream:
+        chunks.append(content)
+
+        # Only parse once the outermost object or array has closed
+        if scanner.feed(content):
+            text = ''.join(chunks)
+            try:
+                return orjson.loads(scanner.document(text))
+            except orjson.JSONDecodeError:
+                pass
+
+    if not chunks:
+        raise Exception('Unexpected OpenAI response format')
+
+    text = ''.join(chunks)
+    parsed = safe_parse(scanner.document(text))
+
+    if parsed is None and scanner.stack:
+        # The document never closed, so the reply was cut off (normally at max_tokens)
+        recovered = scanner.recover(text)
+        raise TruncatedResponseError(safe_parse(recovered) if recovered else None, scanner.open_at_last_close)
+
+    return parsed
 
 # ----- Validation & Normalization -----
 def validate_and_normalize(obj: dict, req: ResearchRequest) -> ResearchOutput:
@@ -243,7 +483,7 @@ def validate_and_normalize(obj: dict, req: ResearchRequest) -> ResearchOutput:
         'notablePeopleOrEntities': [],
         'recommendedSources': [],
         'suggestedHooks': [],
-        'suggestedTone': obj.get('suggestedTone', req.get('style', 'conversational')),
+        'suggestedTone': obj.get('suggestedTone', req.get('style', DEFAULT_STYLE)),
         'scriptNotesForSpeaker': []
     }
 
@@ -377,102 +617,31 @@ def generate_script_from_research(research: ResearchOutput) -> List[PodcastScrip
 
     return script
 
-# ----- Natural Conversation Script Generation -----
-async def generate_conversational_script(research: ResearchOutput, req: ResearchRequest) -> List[PodcastScript]:
-    """Generate a natural two-person podcast conversation using OpenAI"""
-    
-    style = req.get('style', 'conversational')
-    style_guide = STYLE_GUIDES.get(style, STYLE_GUIDES['conversational'])
-    
-    # Build context from research
-    facts_text = "\n".join([f"- {f['fact']}" for f in research['keyFacts'][:8]])
-    terms_text = "\n".join([f"- {t['term']}: {t['definition']}" for t in research['importantTerms'][:5]])
-    segments_text = "\n".join([f"- {s['title']}: {', '.join(s['bullets'][:3])}" for s in research['episodeOutline']['segments']])
-    
-    prompt = f"""You are writing a podcast script for a {req['durationMinutes']}-minute episode about "{research['topic']}".
-
-CRITICAL: Output ONLY a valid JSON array. No markdown, no explanation, no backticks. Start with [ and end with ].
-
-STYLE: {style_guide}
-
-CHARACTERS:
-- Host: The main presenter who guides the conversation, asks probing questions, and keeps things on track. Knowledgeable but curious.
-- Guest: An expert or enthusiastic co-host who brings additional insights, personal anecdotes, different perspectives, and sometimes challenges or builds on what the Host says. NOT a passive listener.
-
-CONVERSATION RULES:
-1. BOTH speakers should contribute substantive content and knowledge
-2. The Guest should share facts, opinions, and ask their own questions - NOT just react with "wow" or "interesting"
-3. Include natural interruptions, agreements, disagreements, and building on each other's points
-4. Use casual language, filler words occasionally (like "you know", "I mean", "right?")
-5. Have moments where they laugh, express surprise genuinely, or get excited
-6. The Guest can correct the Host or add nuance
-7. Include rhetorical questions and direct address to listeners occasionally
-8. Vary the length of responses - some short reactions, some longer explanations
-
-RESEARCH TO INCORPORATE:
-Key Facts:
-{facts_text}
-
-Key Terms:
-{terms_text}
-
-Topics to Cover:
-{segments_text}
-
-Summary: {research['shortSummary']}
-
-OUTPUT FORMAT - Array of dialogue lines:
-[
-  {{"speaker": "Host", "text": "...", "audioEffect": "fade_in"}},
-  {{"speaker": "Guest", "text": "...", "audioEffect": null}},
-  ...
-]
-
-Generate approximately {max(15, req['durationMinutes'] * 3)} dialogue exchanges for a {req['durationMinutes']}-minute episode.
-Each line should be 1-4 sentences. Make it feel like a REAL conversation between two knowledgeable friends.
-
-NOW OUTPUT THE JSON ARRAY:"""
+# ----- Dialogue Validation -----
+def validate_script(lines: list) -> List[PodcastScript]:
+    """Validate and normalize dialogue lines returned by the LLM"""
+    validated_script: List[PodcastScript] = []
+    for i, line in enumerate(lines):
+        if not isinstance(line, dict):
+            continue
+
+        speaker = line.get('speaker', 'Host')
+        if speaker not in ['Host', 'Guest']:
+            speaker = 'Host' if i % 2 == 0 else 'Guest'
+
+        validated_script.append({
+            'speaker': speaker,
+            'text': str(line.get('text', '')),
+            'audioEffect': line.get('audioEffect') if i == 0 else None
+        })
 
-    try:
-        raw = await call_openai(prompt)
-        
-        # Extract JSON array
-        start = raw.find('[')
-        end = raw.rfind(']')
-        if start == -1 or end == -1 or end <= start:
-            raise Exception("Could not find JSON array in response")
-        
-        json_text = raw[start:end + 1]
-        
-        # Try to parse
-        try:
-            script = json.loads(json_text)
-        except json.JSONDecodeError:
-            # Try to repair
-            repaired = repair_json(json_text)
-            script = json.loads(repaired)
-        
-        # Validate and normalize
-        validated_script = []
-        for i, line in enumerate(script):
-            speaker = line.get('speaker', 'Host')
-            if speaker not in ['Host', 'Guest']:
-                speaker = 'Host' if i % 2 == 0 else 'Guest'
-            
-            validated_script.append({
-                'speaker': speaker,
-                'text': str(line.get('text', '')),
-                'audioEffect': line.get('audioEffect') if i == 0 else None
-            })
-        
-        return validated_script
-        
-    except Exception as e:
-        print(f"Error generating conversational script: {e}")
-        # Fallback to basic script from research
-        return generate_script_from_research(research)
+    return validated_script
 
 # ----- Main Export -----
+# Generations currently running, keyed by cache key, so identical
+# concurrent requests share a single LLM call
+_inflight: dict[str, asyncio.Future] = {}
+
 async def generate_podcast_script(req: ResearchRequest) -> List[PodcastScript]:
     """Generate podcast script from topic, duration, and style"""
     key = cache_key(req)
@@ -480,54 +649,103 @@ async def generate_podcast_script(req: ResearchRequest) -> List[PodcastScript]:
     # Check cache
     cached = get_from_cache(key)
     if cached:
-        return generate_script_from_research(cached)
+        return cached['script']
+
+    # Join an identical request that is already running
+    if key in _inflight:
+        return await asyncio.shield(_inflight[key])
+
+    task = asyncio.ensure_future(_generate_uncached(req, key))
+    _inflight[key] = task
+    task.add_done_callback(lambda _: _inflight.pop(key, None))
+
+    # Shield so one caller timing out does not cancel the shared generation
+    return await asyncio.shield(task)
+
+async def _generate_uncached(req: ResearchRequest, key: str) -> List[PodcastScript]:
+    """Run the LLM pipeline for a request and cache the result"""
+    # Resolve the style once; unknown styles fall back to the default guide
+    prompt = build_combined_prompt(req, resolve_style(req.get('style')))
 
-    prompt = build_prompt(req)
+    # Size the output budget to the dialogue the prompt asks for, so short episodes stop sooner
+    max_tokens = RESEARCH_MAX_TOKENS + exchange_count(req['durationMinutes']) * TOKENS_PER_EXCHANGE
 
     # LLM call with retries
-    raw = ''
+    parsed = None
     last_error = None
+    truncated = False
 
-    for attempt in range(3):
+    for attempt in range(MAX_ATTEMPTS):
         try:
-            raw = await call_openai(prompt)
+            parsed = await call_openai(prompt, max_tokens=max_tokens)
+            last_error = None
             break
-        except Exception as e:
+        except TruncatedResponseError as e:
+            # Only usable if the cut fell at the top level or inside the top-level script
+            # array: then the research object closed and every recovered line is whole
+            if e.open_brackets not in (('{',), ('{', '[')):
+                raise Exception(f'LLM response was cut off at {max_tokens} tokens before the research brief was complete')
+
+            # A retry would hit the same limit; keep what did arrive
+            print(f'LLM response was cut off at {max_tokens} tokens, keeping the complete dialogue lines')
+            parsed = e.partial
+            truncated = True
+            last_error = None
+            break
+        except RETRYABLE_ERRORS as e:
             last_error = e
-            await asyncio.sleep(0.5 * (attempt + 1))
+            if attempt < MAX_ATTEMPTS - 1:
+                # Exponential backoff with jitter so concurrent retries don't line up
+                await asyncio.sleep(min(8, (2 ** attempt) * 0.5) + random.uniform(0, 0.5))
 
-    if not raw:
+    if last_error:
         raise Exception(f'LLM calls exhausted: {last_error}')
 
-    # Extract and parse JSON
-    candidate = extract_json(raw) or raw
-    parsed = safe_parse(candidate)
+    # JSON mode rules out malformed output, and cut-off replies were recovered
+    # above, so a reply still missing its research object is not worth another call
+    if not isinstance(parsed, dict) or not isinstance(parsed.get('research'), dict):
+        raise Exception('Unable to parse LLM response: missing research object')
 
-    # Repair if needed
-    if not parsed:
-        repair_prompt = f"""You must output ONLY valid JSON. No explanation, no markdown.
+    output = validate_and_normalize(parsed['research'], req)
 
-Topic: {req['topic']}
-Style: {req.get('style', 'conversational')}
+    script: List[PodcastScript] = []
+    if isinstance(parsed.get('script'), list):
+        script = validate_script(parsed['script'])
+
+    # Outline fallbacks and cut-short episodes are not cached, so a later request
+    # can still get the full dialogue
+    if not script:
+        if not truncated:
+            print('LLM response contained no usable dialogue, falling back to research outline')
+        return generate_script_from_research(output)
+
+    if truncated:
+        # Wrap up the conversation that was cut off mid-way
+        script.append({
+            'speaker': 'Host',
+            'text': 'Thanks for listening. See you next time.',
+            'audioEffect': None
+        })
+        return script
 
-Output the complete research JSON matching the schema provided earlier. Start with {{ and end with }}. Valid JSON only."""
+    set_cache(key, {'research': output, 'script': script})
+    return script
 
-        try:
-            repair_raw = await call_openai(repair_prompt)
-            candidate2 = extract_json(repair_raw) or repair_raw
-            parsed = safe_parse(candidate2)
+async def generate_many(
+    reqs: List[ResearchRequest], concurrency: int = 10
+) -> List[Union[List[PodcastScript], BaseException]]:
+    """Generate scripts for several requests concurrently, at most `concurrency` at a time.
 
-            if not parsed:
-                raise Exception('JSON parsing failed after repair attempt')
-        except Exception as e:
-            raise Exception(f'Unable to parse LLM response: {e}')
+    Results are returned in request order; a failed request yields its exception
+    instead of a script.
+    """
+    sem = asyncio.Semaphore(concurrency)
 
-    output = validate_and_normalize(parsed, req)
-    set_cache(key, output)
+    async def _one(req: ResearchRequest) -> List[PodcastScript]:
+        async with sem:
+            return await generate_podcast_script(req)
 
-    # Generate and return natural conversational script
-    script = await generate_conversational_script(output, req)
-    return script
+    return await asyncio.gather(*(_one(r) for r in reqs), return_exceptions=True)
 
 # ----- Test Harness -----
 if __name__ == '__main__':
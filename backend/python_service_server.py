@@ -1,11 +1,15 @@
 """
 HTTP server wrapper for the podcast research service
 Exposes the generate_podcast_script function as a REST API endpoint
+(/generate) and generate_many for several topics at once (/batch)
 """
 import os
-import json
+import math
 import asyncio
-from http.server import HTTPServer, BaseHTTPRequestHandler
+import orjson
+import threading
+import concurrent.futures
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 import sys
 from dotenv import load_dotenv
 
@@ -15,7 +19,50 @@ load_dotenv()
 # Add current directory to path so we can import the research service
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from Podcast_info_researcher import generate_podcast_script
+from Podcast_info_researcher import generate_podcast_script, generate_many, STYLE_GUIDES, DEFAULT_STYLE
+
+# Persistent event loop (run in a background thread) so the shared OpenAI
+# client keeps its connections alive across requests
+LOOP = asyncio.new_event_loop()
+# Long episodes can stream up to ~16k output tokens, which takes a few minutes
+REQUEST_TIMEOUT_SECONDS = 300
+BATCH_CONCURRENCY = 10
+MAX_BATCH_SIZE = 50
+
+def start_event_loop():
+    """Run the shared event loop in a daemon thread"""
+    thread = threading.Thread(target=LOOP.run_forever, name='research-loop', daemon=True)
+    thread.start()
+    return thread
+
+def run_on_loop(coro, timeout):
+    """Run a coroutine on the shared event loop and wait for its result"""
+    future = asyncio.run_coroutine_threadsafe(coro, LOOP)
+    try:
+        return future.result(timeout=timeout)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        raise Exception(f'Script generation timed out after {timeout} seconds')
+
+def parse_research_request(request_data):
+    """Build a research request from a JSON body, raising ValueError if it is invalid"""
+    if not isinstance(request_data, dict) or 'topic' not in request_data or 'durationMinutes' not in request_data:
+        raise ValueError('Missing required fields: topic, durationMinutes')
+
+    try:
+        duration_minutes = int(request_data['durationMinutes'])
+    except (TypeError, ValueError):
+        raise ValueError('durationMinutes must be a number')
+
+    style = str(request_data.get('style') or DEFAULT_STYLE).lower()
+    if style not in STYLE_GUIDES:
+        raise ValueError(f"Style must be one of: {', '.join(STYLE_GUIDES)}")
+
+    return {
+        'topic': request_data['topic'],
+        'durationMinutes': duration_minutes,
+        'style': style
+    }
 
 class ResearchServiceHandler(BaseHTTPRequestHandler):
     """HTTP request handler for research service"""
@@ -28,62 +75,80 @@ class ResearchServiceHandler(BaseHTTPRequestHandler):
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
         self.end_headers()
     
+    def send_json(self, status, body):
+        """Send an already-serialized JSON body"""
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+
     def do_POST(self):
-        """Handle POST requests to generate podcast script"""
-        if self.path != '/generate':
+        """Handle POST requests to generate podcast scripts"""
+        if self.path == '/generate':
+            handler = self.handle_generate
+        elif self.path == '/batch':
+            handler = self.handle_batch
+        else:
             self.send_error(404, "Endpoint not found")
             return
         
         try:
-            # Read request body
-            content_length = int(self.headers.get('Content-Length', 0))
-            body = self.rfile.read(content_length)
-            request_data = json.loads(body.decode('utf-8'))
-            
-            # Validate request
-            if 'topic' not in request_data or 'durationMinutes' not in request_data:
-                error_response = {'error': 'Missing required fields: topic, durationMinutes'}
-                self.send_response(400)
-                self.send_header('Content-Type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                self.wfile.write(json.dumps(error_response).encode('utf-8'))
-                return
-            
-            # Extract parameters
-            topic = request_data['topic']
-            duration_minutes = int(request_data['durationMinutes'])
-            style = request_data.get('style', 'conversational')
-            
-            # Generate script using async function
-            # Create new event loop for this thread
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                script = loop.run_until_complete(generate_podcast_script({
-                    'topic': topic,
-                    'durationMinutes': duration_minutes,
-                    'style': style
-                }))
-            finally:
-                loop.close()
-            
-            # Send success response
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps(script).encode('utf-8'))
+            # Read and parse the request body straight from bytes
+            request_data = orjson.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+
+            handler(request_data)
             
         except Exception as e:
             # Send error response
             print(f"Error generating script: {e}")
             error_response = {'error': str(e)}
-            self.send_response(500)
-            self.send_header('Content-Type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps(error_response).encode('utf-8'))
+            self.send_json(500, orjson.dumps(error_response))
+
+    def handle_generate(self, request_data):
+        """Generate a single podcast script"""
+        # Validate request
+        try:
+            research_request = parse_research_request(request_data)
+        except ValueError as e:
+            error_response = {'error': str(e)}
+            self.send_json(400, orjson.dumps(error_response))
+            return
+
+        # Generate script on the persistent event loop thread
+        script = run_on_loop(generate_podcast_script(research_request), REQUEST_TIMEOUT_SECONDS)
+
+        # Send success response
+        self.send_json(200, orjson.dumps(script))
+
+    def handle_batch(self, request_data):
+        """Generate scripts for a list of requests concurrently"""
+        items = request_data.get('requests') if isinstance(request_data, dict) else None
+        if not isinstance(items, list) or not items or len(items) > MAX_BATCH_SIZE:
+            error_response = {'error': f'Field "requests" must be a list of 1-{MAX_BATCH_SIZE} requests'}
+            self.send_json(400, orjson.dumps(error_response))
+            return
+
+        # Validate every request before starting any generation
+        research_requests = []
+        for i, item in enumerate(items):
+            try:
+                research_requests.append(parse_research_request(item))
+            except ValueError as e:
+                error_response = {'error': f'Request {i}: {e}'}
+                self.send_json(400, orjson.dumps(error_response))
+                return
+
+        # Allow one request timeout per wave of concurrent generations
+        timeout = REQUEST_TIMEOUT_SECONDS * math.ceil(len(research_requests) / BATCH_CONCURRENCY)
+        results = run_on_loop(generate_many(research_requests, BATCH_CONCURRENCY), timeout)
+
+        # Failed items are reported in place so the rest of the batch still succeeds
+        response = [
+            {'error': str(result)} if isinstance(result, BaseException) else result
+            for result in results
+        ]
+        self.send_json(200, orjson.dumps(response))
     
     def log_message(self, format, *args):
         """Override to customize logging"""
@@ -91,10 +156,12 @@ class ResearchServiceHandler(BaseHTTPRequestHandler):
 
 def run_server(port=8000):
     """Start the HTTP server"""
+    start_event_loop()
     server_address = ('', port)
-    httpd = HTTPServer(server_address, ResearchServiceHandler)
+    httpd = ThreadingHTTPServer(server_address, ResearchServiceHandler)
     print(f"🐍 Python research service running on port {port}")
     print(f"   Endpoint: http://localhost:{port}/generate")
+    print(f"   Batch endpoint: http://localhost:{port}/batch")
     httpd.serve_forever()
 
 if __name__ == '__main__':